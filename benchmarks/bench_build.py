@@ -0,0 +1,183 @@
+# --
+# Copyright (c) 2014-2026 Net-ng.
+# All rights reserved.
+#
+# This software is licensed under the BSD License, as described in
+# the file LICENSE.txt, which you should have received as part of
+# this distribution.
+# --
+
+"""Build benchmarks on a generated asset tree.
+
+Measures a cold build, a build with a warm cache, the build after a single
+file changed and the ``urls()`` latency. The builds are run as the ``webassets
+build`` command runs them, always forced. The tree is generated from a fixed
+seed, so that the results of different versions can be compared.
+
+Usage: python benchmarks/bench_build.py [--packages N] [--js N] [--css N] [--jobs N] [--repeat N] [--json]
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+import statistics
+
+from nagare.services.webassets import Bundle, WebAssets
+from webassets import stats
+from webassets.script import CommandLineEnvironment
+
+JS = """
+/* {name} */
+function {name}_{i}(items, factor) {{
+    var result = [];
+    for (var i = 0; i < items.length; i++) {{
+        result.push(items[i] * factor + {i});
+    }}
+    return result;
+}}
+"""
+
+CSS = """
+/* {name} */
+.{name}-{i} {{
+    background: url("../img/icon.png") no-repeat;
+    margin: {i}px;
+}}
+"""
+
+
+def generate_tree(root, nb_packages, nb_js, nb_css, seed=42):
+    """Generate ``nb_js`` and ``nb_css`` files spread over nested directories of ``nb_packages`` packages."""
+    rnd = random.Random(seed)
+
+    for package in range(nb_packages):
+        for directory in ('js/core', 'js/widgets/forms', 'css', 'img'):
+            os.makedirs(os.path.join(root, 'pkg{}'.format(package), directory))
+        with open(os.path.join(root, 'pkg{}'.format(package), 'img', 'icon.png'), 'wb') as f:
+            f.write(b'\x89PNG' + bytes(rnd.randrange(256) for _ in range(64)))
+
+    for kind, template, nb, directories in (
+        ('js', JS, nb_js, ('js/core', 'js/widgets/forms')),
+        ('css', CSS, nb_css, ('css',)),
+    ):
+        for n in range(nb):
+            name = '{}{}'.format(kind, n)
+            filename = os.path.join(
+                root, 'pkg{}'.format(n % nb_packages), rnd.choice(directories), '{}.{}'.format(name, kind)
+            )
+            with open(filename, 'w') as f:
+                f.write(''.join(template.format(name=name, i=i) for i in range(rnd.randint(5, 30))))
+
+
+def create_service(root, nb_packages):
+    """One container bundle of globbed JS and CSS bundles per package, plus a container of all the packages."""
+    service = WebAssets(
+        'webassets',
+        None,
+        output_dir=os.path.join(root, 'static'),
+        manifest=os.path.join(root, 'static', 'manifest.json'),
+        load_path=[os.path.join(root, 'src')],
+        url='/static',
+        services_service=lambda f, *args, **kw: f(*args, **kw),
+    )
+    service.environment.config['url_mapping'] = {os.path.join(root, 'src'): '/src'}
+
+    packages = []
+    for package in range(nb_packages):
+        packages.append(
+            Bundle(
+                Bundle(
+                    'pkg{}/js/**/*.js'.format(package), filters='rjsmin', output='pkg{}.%(version)s.js'.format(package)
+                ),
+                Bundle('pkg{}/css/*.css'.format(package), filters='cssrewrite', output='pkg{}.css'.format(package)),
+            )
+        )
+        service.bundles['pkg{}'.format(package)] = packages[-1]
+
+    service.bundles['all'] = Bundle(*packages)
+
+    for name, bundle in service.bundles.items():
+        service.environment.register(name, bundle)
+
+    return service
+
+
+def build(service, jobs):
+    """Build all the bundles, as the ``webassets build`` command does."""
+    CommandLineEnvironment(service.environment, logging.getLogger('bench')).invoke(
+        'build', {'bundles': ['all'], 'jobs': jobs}
+    )
+
+
+def measure(func, repeat=1):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    return statistics.median(durations)
+
+
+def run(args):
+    results = {}
+
+    with tempfile.TemporaryDirectory() as root:
+        generate_tree(os.path.join(root, 'src'), args.packages, args.js, args.css)
+        os.mkdir(os.path.join(root, 'static'))
+
+        service = create_service(root, args.packages)
+
+        build_stats = stats.enable()
+        results['cold build (s)'] = measure(lambda: build(service, args.jobs))
+        stats.disable()
+        results['cold build stats'] = build_stats.as_dict()['counters']
+
+        results['warm cache build (s)'] = measure(lambda: build(service, args.jobs), args.repeat)
+
+        changed = os.path.join(
+            root, 'src', 'pkg0', 'css', sorted(os.listdir(os.path.join(root, 'src', 'pkg0', 'css')))[0]
+        )
+
+        def incremental_build():
+            with open(changed, 'a') as f:
+                f.write('.changed { color: red }\n')
+            # Make sure the timestamp changes on low resolution filesystems
+            os.utime(changed, (time.time() + 1, time.time() + 1))
+            build(service, args.jobs)
+
+        results['single file rebuild (s)'] = measure(incremental_build, args.repeat)
+
+        number = args.repeat * 100
+        results['urls() (us)'] = measure(lambda: [service.urls() for _ in range(number)]) / number * 1e6
+        service.freeze()
+        results['frozen urls() (us)'] = measure(lambda: [service.urls() for _ in range(number)]) / number * 1e6
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--packages', type=int, default=10)
+    parser.add_argument('--js', type=int, default=2000)
+    parser.add_argument('--css', type=int, default=1000)
+    parser.add_argument('--jobs', type=int, default=1, help='number of worker processes building the bundles')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='output the results as JSON')
+    args = parser.parse_args()
+
+    results = run(args)
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+    else:
+        for name, value in results.items():
+            print('{:<28} {}'.format(name, value if isinstance(value, dict) else '{:.3f}'.format(value)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# --
+# Copyright (c) 2014-2026 Net-ng.
+# All rights reserved.
+#
+# This software is licensed under the BSD License, as described in
+# the file LICENSE.txt, which you should have received as part of
+# this distribution.
+# --
+
+"""Latency and allocations of ``WebAssets.urls()``, with and without the frozen URLs tables.
+
+Usage: python benchmarks/bench_urls.py [--bundles N] [--files N] [--number N]
+"""
+
+import os
+import timeit
+import argparse
+import tempfile
+import tracemalloc
+
+from nagare.services.webassets import Bundle, WebAssets
+
+
+def create_service(root, nb_bundles, nb_files, freeze_urls):
+    for i in range(nb_files):
+        with open(os.path.join(root, 'src', 'f{}.js'.format(i)), 'w') as f:
+            f.write('function f{}(a, b) {{\n    return a + b;\n}}\n'.format(i) * 20)
+
+    service = WebAssets(
+        'webassets',
+        None,
+        output_dir=os.path.join(root, 'static'),
+        manifest=os.path.join(root, 'static', 'manifest.json'),
+        freeze_urls=freeze_urls,
+        load_path=[os.path.join(root, 'src')],
+        url='/static',
+        services_service=lambda f, *args, **kw: f(*args, **kw),
+    )
+
+    for i in range(nb_bundles):
+        bundle = Bundle('f*.js', filters='rjsmin', output='bundle{}.%(version)s.js'.format(i))
+        service.environment.register('bundle{}'.format(i), bundle)
+        service.bundles['bundle{}'.format(i)] = bundle
+
+    for bundle in service.bundles.values():
+        bundle.build()
+
+    return service
+
+
+def measure(service, number, **kw):
+    service.urls(**kw)
+
+    duration = timeit.timeit(lambda: service.urls(**kw), number=number) / number
+
+    tracemalloc.start()
+    service.urls(**kw)
+    allocated = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return duration, allocated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bundles', type=int, default=10)
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--number', type=int, default=1000)
+    args = parser.parse_args()
+
+    for freeze_urls in (False, True):
+        with tempfile.TemporaryDirectory() as root:
+            os.mkdir(os.path.join(root, 'src'))
+            os.mkdir(os.path.join(root, 'static'))
+
+            service = create_service(root, args.bundles, args.files, freeze_urls)
+            if freeze_urls:
+                service.freeze()
+
+            for sri in (False, True):
+                duration, allocated = measure(service, args.number, sri=sri)
+                print(
+                    '{:<8} sri={:<5}  {:10.2f} us/call  {:8d} bytes peak'.format(
+                        'frozen' if freeze_urls else 'dynamic', str(sri), duration * 1e6, allocated
+                    )
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -14,7 +14,8 @@ vendor_path = os.path.join(os.path.dirname(__file__), '..', 'vendor')
 if vendor_path not in sys.path:
     sys.path.insert(0, vendor_path)
 
-from webassets import script  # noqa: E402
+from webassets import stats, script  # noqa: E402
+from webassets.exceptions import BundleError  # noqa: E402
 
 from nagare.admin import command  # noqa: E402
 
@@ -24,11 +25,13 @@ class Commands(command.Commands):
 
 
 class Command(command.Command):
+    WEBASSETS_COMMAND = None  # webassets command to run, the name of this command by default
+
     def run(self, webassets_service, **config):
         runner = script.CommandLineEnvironment(webassets_service.environment, webassets_service.logger)
 
         try:
-            runner.invoke(self.name, config)
+            runner.invoke(self.WEBASSETS_COMMAND or self.name, config)
             return 0
         except (script.BuildError, script.CommandError) as e:
             print(e.args[0])
@@ -51,15 +54,63 @@ class Build(Command):
             help='optional bundle names to process. If none are specified, then all known bundles will be built',
         )
 
-    def run(self, webassets_service, services_service, no_cache=False, bundles=()):
+        parser.add_argument(
+            '-j', '--jobs', type=int, help='number of worker processes building the bundles in parallel'
+        )
+
+    def run(self, webassets_service, services_service, no_cache=False, bundles=(), jobs=None):
         bundles = bundles or list(webassets_service.bundles)
+        jobs = jobs or webassets_service.jobs
+
+        status = services_service(super().run, no_cache=no_cache, bundles=bundles, jobs=jobs)
+
+        if (status == 0) and webassets_service.snapshot:
+            try:
+                webassets_service.save_snapshot()
+            except (OSError, BundleError) as e:
+                print('Snapshot not saved: {}'.format(e))
+                return 1
+
+        return status
+
+
+class Stats(Build):
+    DESC = 'build assets and report where the time was spent'
+    WEBASSETS_COMMAND = 'build'
+
+    def set_arguments(self, parser):
+        super().set_arguments(parser)
+
+        parser.add_argument('--json', action='store_true', help='output the raw measures as JSON')
+        parser.add_argument(
+            '-n', '--top', type=int, default=20, help='number of operations reported per category (default: 20)'
+        )
+
+    def run(self, webassets_service, services_service, json=False, top=20, **config):
+        build_stats = stats.enable()
+        try:
+            status = super().run(webassets_service, services_service, **config)
+        finally:
+            stats.disable()
 
-        return services_service(super().run, no_cache=no_cache, bundles=bundles)
+        print(build_stats.to_json() if json else build_stats.report(top))
+
+        return status
 
 
 class Clean(Command):
     DESC = 'delete generated assets'
 
+    def run(self, webassets_service, **config):
+        status = super().run(webassets_service, **config)
+
+        if status == 0:
+            for filename in (webassets_service.snapshot, webassets_service.rebuild_stamp):
+                if filename and os.path.exists(filename):
+                    os.remove(filename)
+
+        return status
+
 
 class Check(Command):
     DESC = 'check if assets need to be rebuilt'
@@ -10,6 +10,11 @@
 import os
 import sys
 import gzip
+import json
+import time
+import threading
+from types import MappingProxyType
+from contextlib import nullcontext
 from collections import defaultdict
 
 vendor_path = os.path.join(os.path.dirname(__file__), '..', 'vendor')
@@ -17,13 +22,18 @@ if vendor_path not in sys.path:
     sys.path.insert(0, vendor_path)
 
 from webassets import Bundle, Environment, filter  # noqa: F401
-from webassets.bundle import get_all_bundle_files
+from webassets.merge import CHUNK_SIZE, save_atomically
+from webassets.bundle import wrap, get_all_bundle_files
+from webassets.script import save_digests
+from webassets.exceptions import BuildError, BundleError, FilterError
 
 from nagare.server import reference
 from nagare.services import plugin
-from nagare.admin.webassets import Command
 
 try:
+    from dukpy import tsc, babel
+    from dukpy.evaljs import JSInterpreter
+    from dukpy.nodelike import NodeLikeInterpreter
     from dukpy.webassets import BabelJS, BabelJSX, TypeScript, CompileLess
 
     dukpy = True
@@ -34,13 +44,83 @@ except ImportError:
 class GZipFilter(filter.Filter):
     name = 'gzip'
     binary_output = True
+    streaming = True
 
     def output(self, _in, out, **kw):
-        try:
-            output_file = gzip.GzipFile(fileobj=out, mode='wb')
-            output_file.write(_in.read().encode('utf-8'))
-        finally:
-            output_file.close()
+        with gzip.GzipFile(fileobj=out, mode='wb') as output_file:
+            for chunk in iter(lambda: _in.read(CHUNK_SIZE), ''):
+                output_file.write(chunk.encode('utf-8'))
+
+
+class JSCompiler(threading.local):
+    """A JS interpreter per thread, where the compiler is loaded only once."""
+
+    def __init__(self, interpreter_class, *setup):
+        self.interpreter_class = interpreter_class
+        self.setup = setup
+        self.interpreter = None
+
+    def evaljs(self, code, **kw):
+        if self.interpreter is None:
+            interpreter = self.interpreter_class()
+            for filename in self.setup:
+                with open(filename, encoding='utf-8') as f:
+                    interpreter.evaljs(f)
+            self.interpreter = interpreter
+
+        return self.interpreter.evaljs(code, **kw)
+
+
+if dukpy:
+    BABEL = JSCompiler(JSInterpreter, getattr(babel, 'BABEL_COMPILER', None) or babel._BABEL_COMPILER)
+    TYPESCRIPT = JSCompiler(JSInterpreter, tsc.TS_COMPILER)
+    LESS = JSCompiler(NodeLikeInterpreter)
+
+    class PersistentBabelJS(BabelJS):
+        presets = ['es2015']
+
+        def input(self, _in, out, **kw):
+            options = {'filename': os.path.basename(kw['source_path']), 'presets': self.presets}
+            if self.loader == 'systemjs':
+                options['plugins'] = ['transform-es2015-modules-systemjs']
+            elif self.loader == 'umd':
+                options['plugins'] = ['transform-es2015-modules-umd']
+
+            src = BABEL.evaljs(
+                'Babel.transform(dukpy.es6code, dukpy.babel_options).code;', es6code=_in.read(), babel_options=options
+            )
+            out.write(src)
+
+    class PersistentBabelJSX(PersistentBabelJS):
+        name = BabelJSX.name
+        presets = ['es2015', 'react']
+
+    class PersistentTypeScript(TypeScript):
+        def input(self, _in, out, **kw):
+            src = TYPESCRIPT.evaljs('ts.transpile(dukpy.tscode, %s);' % tsc.TSC_OPTIONS, tscode=_in.read())
+            out.write(src)
+
+    class PersistentCompileLess(CompileLess):
+        def input(self, _in, out, **kw):
+            options = {'paths': list(self.less_includes or []), 'syncImport': True}
+            if 'source_path' in kw:
+                options['paths'].append(os.path.dirname(kw['source_path']))
+
+            res = LESS.evaljs(
+                'var result = null;'
+                'require("less/less-node").render(dukpy.lesscode, dukpy.lessoptions, function(error, output) {'
+                '  result = {"error": error, "output": output};'
+                '});'
+                'result;',
+                lesscode=_in.read(),
+                lessoptions=options,
+            )
+            if not res:
+                raise FilterError('lessc: results or errors unavailable')
+            if res.get('error'):
+                raise FilterError('lessc: ' + res['error']['message'])
+
+            out.write(res['output']['css'])
 
 
 class Storage(Environment.config_storage_class):
@@ -56,10 +136,70 @@ class Env(Environment):
         return self.__class__(**config)
 
 
+def file_stat(filename):
+    """Modification time and size of ``filename``, ``None`` if it doesn't exist."""
+    try:
+        stat = os.stat(filename)
+    except (OSError, TypeError):
+        return None
+
+    return [stat.st_mtime_ns, stat.st_size]
+
+
 def on_change(event, path, o, method, bundles):
     return getattr(o, method)(path, bundles) if event.event_type in ('created', 'modified') else None
 
 
+class RebuildScheduler(threading.Thread):
+    """Coalesce the changes events and rebuild the affected bundles in the background.
+
+    A rebuild is started once no new change was received for ``delay`` seconds. ``on_rebuilt``, if set, is called
+    once the new assets are written.
+    """
+
+    def __init__(self, rebuild, delay, logger, on_rebuilt=None):
+        super().__init__(name='webassets-rebuild', daemon=True)
+
+        self.rebuild = rebuild
+        self.delay = delay
+        self.logger = logger
+        self.on_rebuilt = on_rebuilt
+
+        self.pending = set()
+        self.deadline = 0
+        self.condition = threading.Condition()
+
+    def schedule(self, leaves):
+        """Schedule the rebuild of leaf bundles, without waiting for it.
+
+        In:
+          - ``leaves`` -- ``(bundle name, leaf index)`` tuples
+        """
+        with self.condition:
+            self.pending.update(leaves)
+            self.deadline = time.monotonic() + self.delay
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+
+                while (remaining := self.deadline - time.monotonic()) > 0:
+                    self.condition.wait(remaining)
+
+                leaves, self.pending = self.pending, set()
+
+            try:
+                self.rebuild(leaves)
+                if self.on_rebuilt is not None:
+                    self.on_rebuilt()
+            except Exception:
+                # Keep the thread alive for the next changes
+                self.logger.exception('Rebuild of %s failed', ', '.join(sorted({name for name, _ in leaves})))
+
+
 class WebAssets(plugin.Plugin):
     """Web assets manager."""
 
@@ -70,6 +210,8 @@ class WebAssets(plugin.Plugin):
         'reload': 'boolean(default=False)',
         'debug': 'boolean(default=False)',
         'cache': 'boolean(default=True)',
+        'cache_location': 'string(default=None)',
+        'cache_max_size': 'integer(default=None)',
         'url': 'string(default="/static$app_url")',
         'url_expire': 'boolean(default=None)',
         'manifest': 'string(default="$static/manifest.json")',
@@ -77,6 +219,13 @@ class WebAssets(plugin.Plugin):
         'versions': 'string(default="hash")',
         'load_path': 'string_list(default=list("$root"))',
         'cache_file_mode': 'string(default=None)',
+        'precompress': 'string_list(default=list())',
+        'jobs': 'integer(default=1)',
+        'workers': 'integer(default=0)',
+        'workers_timeout': 'float(default=60)',
+        'rebuild_delay': 'float(default=0.2)',
+        'freeze_urls': 'boolean(default=False)',
+        'snapshot': 'string(default=None)',
         'mapping': {'___many___': 'string'},
     }
 
@@ -89,7 +238,15 @@ class WebAssets(plugin.Plugin):
         watch=True,
         reload=False,
         manifest='',
+        cache=True,
+        cache_location=None,
         mapping=None,
+        jobs=1,
+        workers=0,
+        workers_timeout=60,
+        rebuild_delay=0.2,
+        freeze_urls=False,
+        snapshot=None,
         services_service=None,
         **config,
     ):
@@ -103,7 +260,15 @@ class WebAssets(plugin.Plugin):
             watch=watch,
             reload=reload,
             manifest=manifest,
+            cache=cache,
+            cache_location=cache_location,
             mapping=mapping,
+            jobs=jobs,
+            workers=workers,
+            workers_timeout=workers_timeout,
+            rebuild_delay=rebuild_delay,
+            freeze_urls=freeze_urls,
+            snapshot=snapshot,
             **config,
         )
 
@@ -111,13 +276,27 @@ class WebAssets(plugin.Plugin):
             directory=output_dir,
             auto_build=False,
             manifest='json:{}'.format(manifest) if manifest else False,
+            cache=(cache_location or True) if cache else False,
             url_mapping=mapping or {},
+            external_tool_workers=workers,
+            external_tool_workers_timeout=workers_timeout,
             **config,
         )
+        self.manifest = manifest or None
         self.reload = False if reload else None
         self.watch = watch
-
-        if dukpy:
+        self.jobs = jobs
+        self.rebuild_scheduler = RebuildScheduler(self.rebuild, rebuild_delay, self.logger)
+        self.freeze_urls = freeze_urls
+        self.frozen_urls = None  # ({bundle name: urls}, {bundle name: ((url, sri), ...)})
+        self.snapshot = snapshot
+
+        if dukpy and workers:
+            filter.register_filter(PersistentTypeScript)
+            filter.register_filter(PersistentBabelJSX)
+            filter.register_filter(PersistentBabelJS)
+            filter.register_filter(PersistentCompileLess)
+        elif dukpy:
             filter.register_filter(TypeScript)
             filter.register_filter(BabelJSX)
             filter.register_filter(BabelJS)
@@ -139,28 +318,228 @@ class WebAssets(plugin.Plugin):
     def config(self):
         return self.environment.config
 
-    def build_on_change(self, path, bundles):
-        status = Command('build').run(self, bundles=bundles)
-        if status == 0:
-            self.logger.info('Build done: ' + ', '.join(bundles))
+    def rebuild(self, leaves):
+        """Rebuild leaf bundles.
+
+        In:
+          - ``leaves`` -- ``(bundle name, leaf index)`` tuples, the index being in ``bundle.iterbuild()``
+        """
+        # Only resolved now, for the service startup to not resolve the bundles and load their filters when a snapshot
+        # gives their files. A leaf can be shared by several bundles, all to be refrozen once it is rebuilt.
+        bundles_leaves = {}
+        to_build = {}
+        for bundle_name, index in leaves:
+            if bundle_name not in bundles_leaves:
+                bundle = self.bundles[bundle_name]
+                bundles_leaves[bundle_name] = list(bundle.iterbuild(wrap(self.environment, bundle)))
+
+            leaf, extra_filters, ctx = bundles_leaves[bundle_name][index]
+            to_build.setdefault(leaf, (set(), extra_filters, ctx))[0].add(bundle_name)
+
+        built = set()
+
+        manifest = self.environment.manifest
+        with manifest.batch() if manifest else nullcontext():
+            for leaf, (bundles_names, extra_filters, ctx) in to_build.items():
+                try:
+                    leaf._build(ctx, extra_filters, force=True)
+                except BuildError as e:
+                    self.logger.error('Build of %s failed: %s', ', '.join(sorted(bundles_names)), e)
+                except Exception:
+                    # A failing filter doesn't prevent the other leaves, coalesced in the same rebuild, to be built
+                    self.logger.exception('Build of %s failed', ', '.join(sorted(bundles_names)))
+                else:
+                    built.update(bundles_names)
+
+        save_digests(self.environment)
+
+        if built:
+            self.logger.info('Build done: ' + ', '.join(sorted(built)))
+
+            if self.frozen_urls is not None:
+                try:
+                    self.freeze(built)
+                except (OSError, BundleError) as e:
+                    self.logger.error('URLs of %s not updated: %s', ', '.join(sorted(built)), e)
+
+            if self.snapshot:
+                try:
+                    self.save_snapshot()
+                except (OSError, BundleError) as e:
+                    self.logger.error('Snapshot %s not updated: %s', self.snapshot, e)
+
+    def build_on_change(self, path, leaves):
+        # Return at once, for the next changes to be coalesced into the same rebuild. The reloader is not asked to
+        # react now, before the new assets are written, but from ``rebuilt()``.
+        self.rebuild_scheduler.schedule(leaves)
+
+    @property
+    def manifest_filename(self):
+        # From the configuration, as ``environment.manifest`` loads the manifest
+        return os.path.join(self.environment.directory, self.manifest) if self.manifest else None
+
+    @property
+    def rebuild_stamp(self):
+        return os.path.join(self.environment.directory, '.webassets-rebuilt')
+
+    def rebuilt(self):
+        """Signal the end of a rebuild to the reloader, by touching the watched rebuild stamp file."""
+        with open(self.rebuild_stamp, 'a'):
+            os.utime(self.rebuild_stamp)
 
+    def reload_on_rebuilt(self, path, bundles):
         return self.reload
 
+    def freeze(self, bundles_names=()):
+        """Compute the URLs and SRI of the bundles once, for ``urls()`` to only do lookups.
+
+        In:
+          - ``bundles_names`` -- bundles to update in the current tables (all the bundles by default)
+        """
+        urls, sris = self.frozen_urls or ({}, {})
+        urls, sris = dict(urls), dict(sris)
+
+        for bundle_name in bundles_names or self.bundles:
+            sris[bundle_name] = tuple(
+                (url['uri'], url['sri']) for url in self.bundles[bundle_name].urls(calculate_sri=True)
+            )
+            urls[bundle_name] = tuple(url for url, _ in sris[bundle_name])
+
+        # Swapped in one assignment, a concurrent ``urls()`` never sees a mix of both
+        self.frozen_urls = (MappingProxyType(urls), MappingProxyType(sris))
+
+    def save_snapshot(self):
+        """Write the resolved contents, outputs, versions and URLs of all the bundles to the snapshot file.
+
+        The modification times and sizes of the manifest and of the outputs are recorded too, for a build done since
+        to invalidate the snapshot.
+        """
+        bundles = {}
+        for bundle_name, bundle in self.bundles.items():
+            # Computing the URLs also retrieves the versions of the leaf bundles
+            urls = [(url['uri'], url['sri']) for url in bundle.urls(calculate_sri=True)]
+
+            leaves = []
+            for leaf, _, ctx in bundle.iterbuild(wrap(self.environment, bundle)):
+                output = leaf.resolve_output(ctx) if leaf.output else None
+                leaves.append(
+                    {
+                        'contents': get_all_bundle_files(leaf, ctx),
+                        'output': output,
+                        'output_stat': file_stat(output),
+                        'version': leaf.version or None,
+                    }
+                )
+
+            bundles[bundle_name] = {'urls': urls, 'leaves': leaves}
+
+        snapshot = {
+            'url': self.environment.url,
+            'manifest_stat': file_stat(self.manifest_filename),
+            'bundles': bundles,
+        }
+        save_atomically(self.snapshot, json.dumps(snapshot, indent=4))
+
+    def is_snapshot_valid(self, snapshot):
+        """Check the snapshot was taken for the current bundles and URL, and no build happened since."""
+        if (snapshot['url'] != self.environment.url) or (set(snapshot['bundles']) != set(self.bundles)):
+            return False
+
+        if snapshot['manifest_stat'] != file_stat(self.manifest_filename):
+            return False
+
+        return all(
+            leaf['output_stat'] == file_stat(leaf['output'])
+            for bundle in snapshot['bundles'].values()
+            for leaf in bundle['leaves']
+            if leaf['output']
+        )
+
+    def load_snapshot(self):
+        """Freeze the URLs tables from the snapshot file, without resolving the bundles.
+
+        Return:
+          - the snapshot, or ``None`` if it is out of date
+        """
+        with open(self.snapshot, encoding='utf-8') as f:
+            snapshot = json.load(f)
+
+        if not self.is_snapshot_valid(snapshot):
+            self.logger.warning('Snapshot %s out of date, ignored', self.snapshot)
+            return None
+
+        sris = {bundle_name: tuple(map(tuple, bundle['urls'])) for bundle_name, bundle in snapshot['bundles'].items()}
+        urls = {bundle_name: tuple(url for url, _ in bundle_sris) for bundle_name, bundle_sris in sris.items()}
+
+        self.frozen_urls = (MappingProxyType(urls), MappingProxyType(sris))
+
+        return snapshot
+
     def handle_serve(self, app, services_service, reloader_service=None):
         self.environment.config.setdefault('url', app.static_url)
 
-        if self.watch and (reloader_service is not None) and self.bundles:
-            filenames = defaultdict(tuple)
-            for bundle_name, bundle in self.bundles.items():
-                for filename in set(get_all_bundle_files(bundle)):
-                    filenames[filename] += (bundle_name,)
+        snapshot = None
+        if self.snapshot and self.bundles:
+            try:
+                snapshot = self.load_snapshot()
+            except (OSError, ValueError, KeyError) as e:
+                self.logger.error('Snapshot %s not loaded: %s', self.snapshot, e)
 
-            bundles = {bundles: bundles for bundles in filenames.values()}
+        if (snapshot is None) and self.freeze_urls and self.bundles:
+            try:
+                self.freeze()
+            except (OSError, BundleError) as e:
+                self.logger.error('URLs not frozen, bundles not built? %s', e)
 
-            for filename, bundle_names in filenames.items():
+        if self.watch and (reloader_service is not None) and self.bundles:
+            filenames = defaultdict(set)
+            for bundle_name, bundle in self.bundles.items():
+                if snapshot:
+                    # Valid, so its leaves are the ones of the bundle
+                    contents = [leaf['contents'] for leaf in snapshot['bundles'][bundle_name]['leaves']]
+                else:
+                    contents = [
+                        get_all_bundle_files(leaf, ctx)
+                        for leaf, _, ctx in bundle.iterbuild(wrap(self.environment, bundle))
+                    ]
+
+                for index, files in enumerate(contents):
+                    for filename in set(files):
+                        filenames[filename].add((bundle_name, index))
+
+            for filename, leaves in filenames.items():
+                reloader_service.watch_file(filename, on_change, o=self, method='build_on_change', bundles=leaves)
+
+            if self.reload is not None:
+                self.rebuilt()
                 reloader_service.watch_file(
-                    filename, on_change, o=self, method='build_on_change', bundles=bundles[bundle_names]
+                    self.rebuild_stamp, on_change, o=self, method='reload_on_rebuilt', bundles=None
                 )
-
-    def urls(self, *bundles_names):
-        return {bundle_name: self.bundles[bundle_name].urls() for bundle_name in bundles_names or self.bundles}
+                self.rebuild_scheduler.on_rebuilt = self.rebuilt
+
+            if not self.rebuild_scheduler.is_alive():
+                self.rebuild_scheduler.start()
+
+    def urls(self, *bundles_names, sri=False):
+        """URLs of the bundles.
+
+        In:
+          - ``bundles_names`` -- names of the bundles (all the bundles by default)
+          - ``sri`` -- return ``(url, SRI)`` tuples instead of only the URLs
+
+        Return:
+          - ``{bundle name: urls}``
+        """
+        frozen_urls = self.frozen_urls
+        if frozen_urls is not None:
+            table = frozen_urls[1] if sri else frozen_urls[0]
+            # Lists, as in the dynamic mode, and copies, for the callers to never alter the shared tables
+            return {bundle_name: list(table[bundle_name]) for bundle_name in bundles_names or table}
+
+        if not sri:
+            return {bundle_name: self.bundles[bundle_name].urls() for bundle_name in bundles_names or self.bundles}
+
+        return {
+            bundle_name: [(url['uri'], url['sri']) for url in self.bundles[bundle_name].urls(calculate_sri=True)]
+            for bundle_name in bundles_names or self.bundles
+        }
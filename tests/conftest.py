@@ -0,0 +1,15 @@
+# --
+# Copyright (c) 2014-2026 Net-ng.
+# All rights reserved.
+#
+# This software is licensed under the BSD License, as described in
+# the file LICENSE.txt, which you should have received as part of
+# this distribution.
+# --
+
+import os
+import sys
+
+vendor_path = os.path.join(os.path.dirname(__file__), '..', 'src', 'nagare', 'vendor')
+if vendor_path not in sys.path:
+    sys.path.insert(0, vendor_path)
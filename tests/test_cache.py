@@ -0,0 +1,71 @@
+# --
+# Copyright (c) 2014-2026 Net-ng.
+# All rights reserved.
+#
+# This software is licensed under the BSD License, as described in
+# the file LICENSE.txt, which you should have received as part of
+# this distribution.
+# --
+
+import sqlite3
+
+from webassets.cache import MemoryCache, SqliteCache
+
+
+def test_memory_lru():
+    cache = MemoryCache(capacity=3)
+    for key in 'abc':
+        cache.set(key, key)
+
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.get('a') == 'a'
+    cache.set('d', 'd')
+
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in 'acd'] == ['a', 'c', 'd']
+    assert len(cache.cache) == 3
+
+
+def test_memory_max_size():
+    cache = MemoryCache(capacity=100, max_size=25)
+    for key in 'abc':
+        cache.set(key, key * 10)
+
+    assert cache.get('a') is None
+    assert cache.get('b') == 'b' * 10
+    assert cache.size == 20
+
+    # Replacing an entry doesn't count its old size twice
+    cache.set('b', 'B' * 5)
+    assert cache.size == 15
+    cache.set('d', 'd' * 10)
+    assert [cache.get(key) for key in 'bcd'] == ['B' * 5, 'c' * 10, 'd' * 10]
+
+    # An entry bigger than the budget is still kept alone
+    cache.set('e', 'e' * 30)
+    assert cache.get('e') == 'e' * 30
+    assert len(cache.cache) == 1
+
+
+def test_sqlite_evict(tmp_path):
+    filename = str(tmp_path / 'cache.db')
+
+    cache = SqliteCache(filename)
+    for i in range(10):
+        cache.set(str(i), b'x' * 100)
+        # Distinct access times, in the insertion order
+        cache.connection.execute('UPDATE entries SET atime = ? WHERE size = 100 AND atime > ?', (i, i))
+
+    # Over the budget: go down to 90% of it, the least recently used first
+    cache.max_size = 950
+    cache._evicting.acquire()
+    cache._evict()
+
+    with sqlite3.connect(filename) as connection:
+        assert connection.execute('SELECT SUM(size) FROM entries').fetchone()[0] <= 950 * 0.9
+        assert [atime for (atime,) in connection.execute('SELECT atime FROM entries ORDER BY atime')] == list(
+            range(2, 10)
+        )
+
+    assert cache.get('0') is None
+    assert cache.get('9') == b'x' * 100
@@ -0,0 +1,78 @@
+# --
+# Copyright (c) 2014-2026 Net-ng.
+# All rights reserved.
+#
+# This software is licensed under the BSD License, as described in
+# the file LICENSE.txt, which you should have received as part of
+# this distribution.
+# --
+
+import io
+
+import pytest
+from webassets import Bundle, Environment
+from webassets.filter.cssrewrite import CSSRewrite
+from webassets.filter.cssrewrite.base import CSSUrlRewriter, PatternRewriter
+
+CSS = """.a { background: url(img/a.png) }
+.b {
+    background: url(
+        "img/b.png"
+    );
+}
+.c { background: url( img/c\\).png ) url(
+'img/d.png') }
+.d { background: url(img/e.png) }
+"""
+
+
+class UpperRewriter(CSSUrlRewriter):
+    def input(self, _in, out, **kw):
+        return PatternRewriter.input(self, _in, out, **kw)
+
+    def replace_url(self, url):
+        return url.upper()
+
+
+@pytest.mark.parametrize(
+    'css',
+    [CSS, CSS.rstrip(), CSS + '.e { background: url(\n', 'url(' + 'x' * 70000 + '\n)'],
+    ids=['lines', 'no-final-newline', 'unclosed', 'long'],
+)
+def test_streaming(css):
+    out = io.StringIO()
+    UpperRewriter().input(io.StringIO(css), out)
+
+    # Same result as rewriting the whole content at once
+    expected = io.StringIO()
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr(UpperRewriter, 'streaming', False)
+        UpperRewriter().input(io.StringIO(css), expected)
+
+    assert out.getvalue() == expected.getvalue()
+
+
+def test_multiline_url(tmp_path, monkeypatch):
+    (tmp_path / 'src' / 'css').mkdir(parents=True)
+    (tmp_path / 'src' / 'css' / 'a.css').write_text(CSS)
+    (tmp_path / 'out').mkdir()
+
+    def build(streaming):
+        monkeypatch.setattr(CSSRewrite, 'streaming', streaming)
+
+        env = Environment(
+            str(tmp_path / 'out'),
+            '/out',
+            load_path=[str(tmp_path / 'src')],
+            url_mapping={str(tmp_path / 'src'): '/src'},
+            cache=False,
+            manifest=False,
+        )
+        Bundle('css/a.css', filters='cssrewrite', output='gen/all.css', env=env).build(force=True)
+
+        return (tmp_path / 'out' / 'gen' / 'all.css').read_text()
+
+    css = build(True)
+    assert css == build(False)
+    assert '"../../src/css/img/b.png"' in css
+    assert "'../../src/css/img/d.png'" in css
@@ -0,0 +1,63 @@
+# --
+# Copyright (c) 2014-2026 Net-ng.
+# All rights reserved.
+#
+# This software is licensed under the BSD License, as described in
+# the file LICENSE.txt, which you should have received as part of
+# this distribution.
+# --
+
+import os
+
+import pytest
+from webassets import Bundle, Environment, stats
+from webassets.filter import Filter
+
+
+@pytest.mark.parametrize('cache', [True, 'sqlite://cache.db'], ids=['filesystem', 'sqlite'])
+def test_depends(tmp_path, cache):
+    (tmp_path / 'a.js').write_text('a')
+    include = tmp_path / 'include.js'
+    include.write_text('1')
+
+    calls = []
+
+    # Fake compiler: appends the content of the include to the source
+    class Include(Filter):
+        name = 'include'
+
+        def input(self, _in, out, **kw):
+            calls.append(kw['source_path'])
+            out.write(_in.read() + include.read_text())
+
+    env = Environment(str(tmp_path), '/', cache=cache, manifest=False)
+    bundle = Bundle('a.js', filters=Include(), depends='include.js', output='all.js', env=env)
+
+    def build(force=True):
+        stats.enable()
+        try:
+            bundle.build(force=force)
+            return stats.get_stats().counters
+        finally:
+            stats.disable()
+
+    counters = build()
+    assert counters == {'cache.misses': 1}
+    assert (tmp_path / 'all.js').read_text() == 'a1'
+    assert len(calls) == 1
+
+    # No change: the filter result is read from the cache
+    counters = build()
+    assert counters == {'cache.hits': 1}
+    assert (tmp_path / 'all.js').read_text() == 'a1'
+    assert len(calls) == 1
+
+    # A changed dependency triggers a rebuild, without using the cached result
+    include.write_text('22')
+    mtime = os.stat(str(tmp_path / 'all.js')).st_mtime + 10
+    os.utime(str(include), (mtime, mtime))
+
+    counters = build(force=False)
+    assert counters == {'cache.misses': 1}
+    assert (tmp_path / 'all.js').read_text() == 'a22'
+    assert len(calls) == 2
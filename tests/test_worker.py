@@ -0,0 +1,120 @@
+# --
+# Copyright (c) 2014-2026 Net-ng.
+# All rights reserved.
+#
+# This software is licensed under the BSD License, as described in
+# the file LICENSE.txt, which you should have received as part of
+# this distribution.
+# --
+
+import io
+import sys
+
+import pytest
+from webassets import Bundle, Environment
+from webassets.bundle import wrap
+from webassets.filter import ExternalTool
+from webassets.worker import WorkerPool, read_frame, write_frame, generic_worker, shutdown_workers
+from webassets.exceptions import FilterError
+
+# Fake tool: upper-cases its stdin, fails if it contains "fail"
+TOOL = """
+import sys
+
+data = sys.stdin.read()
+if 'fail' in data:
+    sys.stderr.write('failed on purpose')
+    sys.exit(3)
+
+sys.stdout.write(data.upper())
+"""
+
+
+@pytest.fixture
+def tool(tmp_path):
+    filename = tmp_path / 'tool.py'
+    filename.write_text(TOOL)
+
+    return [sys.executable, str(filename)]
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(generic_worker(), size=2)
+    yield pool
+    pool.close()
+
+
+def test_frames():
+    stream = io.BytesIO()
+    write_frame(stream, b'hello')
+    write_frame(stream, b'')
+
+    stream.seek(0)
+    assert read_frame(stream) == b'hello'
+    assert read_frame(stream) == b''
+    with pytest.raises(EOFError):
+        read_frame(stream)
+
+    with pytest.raises(EOFError):
+        read_frame(io.BytesIO(stream.getvalue()[:6]))
+
+
+def test_run(pool, tool):
+    assert pool.run(tool, b'abc') == (0, b'ABC', b'')
+    assert pool.run(tool) == (0, b'', b'')
+
+    # The same worker served both requests
+    assert pool._count == 1
+
+
+def test_failure(pool, tool):
+    assert pool.run(tool, b'fail') == (3, b'', b'failed on purpose')
+    assert pool.run([sys.executable + '-missing'])[0] == 127
+
+    # A failing tool doesn't break the worker
+    assert pool.run(tool, b'abc') == (0, b'ABC', b'')
+    assert pool._count == 1
+
+
+def test_restart(pool, tool):
+    assert pool.run(tool, b'abc') == (0, b'ABC', b'')
+
+    worker = pool._idle[0]
+    worker.proc.kill()
+    worker.proc.wait()
+
+    assert pool.run(tool, b'def') == (0, b'DEF', b'')
+    assert pool._idle[0] is not worker
+    assert pool._count == 1
+
+
+def test_filter(tmp_path, tool):
+    class Upper(ExternalTool):
+        name = 'upper'
+        method = 'output'
+        argv = tool
+
+    env = Environment(str(tmp_path), '/', external_tool_workers=1)
+
+    # Without a worker, the tool keeps running as a one-shot process
+    f = Upper()
+    f.set_context(wrap(env, Bundle()))
+    f.setup()
+    assert f.worker_pool is None
+
+    Upper.worker = generic_worker()
+    f = Upper()
+    f.set_context(wrap(env, Bundle()))
+    f.setup()
+    try:
+        assert f.worker_pool is not None
+
+        out = io.StringIO()
+        f.output(io.StringIO('abc'), out)
+        assert out.getvalue() == 'ABC'
+
+        with pytest.raises(FilterError, match='failed on purpose'):
+            f.output(io.StringIO('fail'), io.StringIO())
+    finally:
+        shutdown_workers()